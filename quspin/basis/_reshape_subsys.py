@@ -77,6 +77,28 @@ def _lattice_reshape_pure(psi,sub_sys_A,L,sps):
 
 	return psi_v
 
+def _lattice_reshape_plan(sub_sys_A,L,sps):
+	"""
+	This function returns the gather indices which reshape a dense pure state psi over the Hilbert space defined 
+	by sub_sys_A and its complement: psi[...,ind].reshape(extra_dims+shape) == _lattice_reshape_pure(psi,...).
+	The indices only depend on the bipartition so they can be reused for any number of states. Returns 
+	ind=None if no reordering of the sites is needed.
+	"""
+	sub_sys_B = set(range(L))-set(sub_sys_A)
+
+	sub_sys_A = tuple(sub_sys_A)
+	sub_sys_B = tuple(sub_sys_B)
+
+	Ns_A = (sps**len(sub_sys_A))
+	Ns_B = (sps**len(sub_sys_B))
+	T_tup = sub_sys_A+sub_sys_B
+	if T_tup == tuple(range(L)):
+		ind = None
+	else:
+		ind = _shuffle_sites(sps,T_tup,_np.arange(sps**L,dtype=_np.intp))
+
+	return ind,(Ns_A,Ns_B)
+
 '''
 def _lattice_reshape_pure(psi,sub_sys_A,L,sps):
 	"""
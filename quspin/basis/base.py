@@ -27,13 +27,47 @@ def _update_diag(diag,ind,ME):
 	for i in range(ind.size):
 		diag[ind[i]] += ME[i]
 
+def _merge_coo_chunks(chunks,Ns,dtype):
+	""" concatenates the coo chunks into a single csr matrix, sorting indices and summing duplicates once."""
+	if len(chunks) == 1:
+		row,col,ME = chunks[0]
+	else:
+		row = _np.concatenate([chunk[0] for chunk in chunks])
+		col = _np.concatenate([chunk[1] for chunk in chunks])
+		ME = _np.concatenate([chunk[2] for chunk in chunks])
+
+	A = _sp.csr_matrix((ME,(row,col)),shape=(Ns,Ns),dtype=dtype)
+	A.sum_duplicates()
+	return A
+
+def _append_coo_chunk(chunks,row,col,ME):
+	""" stores a copy of the filled coo buffers in `chunks`, returns the size of the copy in bytes."""
+	chunks.append((row.copy(),col.copy(),ME.copy()))
+	return row.nbytes + col.nbytes + ME.nbytes
+
+def _csr_to_coo_chunk(A,index_type):
+	row = _np.repeat(_np.arange(A.shape[0],dtype=index_type),_np.diff(A.indptr))
+	return row,A.indices.astype(index_type,copy=False),A.data
+
+def _coo_chunks_nbytes(chunks):
+	return sum(row.nbytes+col.nbytes+ME.nbytes for row,col,ME in chunks)
+
+def _csr_nbytes(A):
+	if A is None:
+		return 0
+	else:
+		return A.data.nbytes + A.indices.nbytes + A.indptr.nbytes
+
 MAXPRINT = 50
+# maximum size (in bytes) of the coo buffers used to construct matrices in `basis._make_matrix`.
+MAX_BUFFER_NBYTES = 2**28
 # this file stores the base class for all basis classes
 
 __all__=["basis","isbasis"]
 
 class basis(object):
-
+	_make_matrix_max_buffer_nbytes = MAX_BUFFER_NBYTES
+	_make_matrix_peak_nbytes = 0
 
 	def __init__(self):
 		self._Ns = 0
@@ -136,6 +170,22 @@ class basis(object):
 
 		return v_out			
 
+	def _inplace_Op_list(self,v_in,op_list,dtype,transposed=False,conjugated=False,v_out=None):
+		""" applies the sum of the operators in `op_list` (list of (opstr,indx,J)) to `v_in`, adding the result to `v_out`.
+
+		default version for all basis classes which calls `_inplace_Op` for every term.
+		"""
+		v_in = _np.asanyarray(v_in)
+
+		if v_out is None:
+			result_dtype = _np.result_type(v_in.dtype,dtype)
+			v_out = _np.zeros_like(v_in,dtype=result_dtype)
+
+		for opstr,indx,J in op_list:
+			self._inplace_Op(v_in,opstr,indx,J,dtype,transposed=transposed,conjugated=conjugated,v_out=v_out)
+
+		return v_out
+
 	def inplace_Op(self,v_in,opstr,indx,J,dtype,transposed=False,conjugated=False,v_out=None):
 		"""Calculates the action of an operator on a state.
 
@@ -227,38 +277,110 @@ class basis(object):
 		return self._Op(opstr,indx,J,dtype)
 
 	def _make_matrix(self,op_list,dtype):
-		""" takes list of operator strings and couplings to create matrix."""
-		off_diag = None
+		""" takes list of operator strings and couplings to create matrix.
+
+		The matrix elements of all terms are gathered into preallocated COO buffers. Full buffers are kept 
+		as COO chunks which are sorted and summed into a csr matrix once at the end. The size of the 
+		buffers is bounded by `_make_matrix_max_buffer_nbytes`; whenever the stored chunks grow larger than 
+		twice the last merged chunk plus one buffer they are merged into a single chunk (summing duplicates), 
+		so that the total cost stays linear in the number of matrix elements. The peak memory (in bytes) used 
+		by the buffers and chunks is stored in `_make_matrix_peak_nbytes`.
+
+		Notes
+		-----
+		The generic basis still calls `Op` once per operator string; `basis_general` overrides this method and 
+		evaluates all operator strings in a single sweep over the basis.
+
+		"""
+		Ns = self.Ns
+		index_type = _np.result_type(_np.int32,_np.min_scalar_type(max(Ns-1,0)))
+		itemsize = 2*_np.dtype(index_type).itemsize + _np.dtype(dtype).itemsize
+		buffer_size = min(len(op_list)*Ns,max(self._make_matrix_max_buffer_nbytes//itemsize,Ns))
+
+		row_buf = _np.zeros(buffer_size,dtype=index_type)
+		col_buf = _np.zeros(buffer_size,dtype=index_type)
+		ME_buf = _np.zeros(buffer_size,dtype=dtype)
+
+		chunks = []
+		chunks_nbytes = 0
+		merged_nbytes = 0
 		diag = None
+		nnz = 0
+		peak_nbytes = row_buf.nbytes + col_buf.nbytes + ME_buf.nbytes
 
 		for opstr,indx,J in op_list:
 			ME,row,col = self.Op(opstr,indx,J,dtype)
-			if(len(ME)>0):
-				imax = max(row.max(),col.max())
-				index_type = _np.result_type(_np.int32,_np.min_scalar_type(imax))
-				row = row.astype(index_type)
-				col = col.astype(index_type)
-				if _is_diagonal(row,col):
-					if diag is None:
-						diag = _np.zeros(self.Ns,dtype=dtype)
-
-					_update_diag(diag,row,ME)
-				else:
-					if off_diag is None:
-						off_diag = _sp.csr_matrix((ME,(row,col)),shape=(self.Ns,self.Ns),dtype=dtype) 
-					else:
-						off_diag = off_diag + _sp.csr_matrix((ME,(row,col)),shape=(self.Ns,self.Ns),dtype=dtype) 
+			n = len(ME)
+			if n == 0:
+				continue
+
+			if _is_diagonal(row,col):
+				if diag is None:
+					diag = _np.zeros(Ns,dtype=dtype)
+
+				_update_diag(diag,row,ME)
+				continue
+
+			if nnz + n > buffer_size:
+				chunks_nbytes += _append_coo_chunk(chunks,row_buf[:nnz],col_buf[:nnz],ME_buf[:nnz])
+				nnz = 0
+				buffer_nbytes = row_buf.nbytes + col_buf.nbytes + ME_buf.nbytes
+				peak_nbytes = max(peak_nbytes,buffer_nbytes+chunks_nbytes)
+
+				if len(chunks) > 1 and chunks_nbytes > 2*merged_nbytes + buffer_nbytes:
+					A = _merge_coo_chunks(chunks,Ns,dtype)
+					peak_nbytes = max(peak_nbytes,buffer_nbytes+2*chunks_nbytes+_csr_nbytes(A))
+					chunks[:] = [_csr_to_coo_chunk(A,index_type)]
+					del A
+					chunks_nbytes = merged_nbytes = _coo_chunks_nbytes(chunks)
+
+			if n > buffer_size: # some basis classes can return more than Ns matrix elements per term.
+				buffer_size = n
+				row_buf = _np.zeros(buffer_size,dtype=index_type)
+				col_buf = _np.zeros(buffer_size,dtype=index_type)
+				ME_buf = _np.zeros(buffer_size,dtype=dtype)
+
+			row_buf[nnz:nnz+n] = row
+			col_buf[nnz:nnz+n] = col
+			ME_buf[nnz:nnz+n] = ME
+			nnz += n
+
+		if diag is not None and (chunks or nnz > 0):
+			# add diagonal to the remaining buffer to avoid an extra sparse addition.
+			nz = _np.flatnonzero(diag)
+			if nnz + nz.size > buffer_size:
+				chunks_nbytes += _append_coo_chunk(chunks,row_buf[:nnz],col_buf[:nnz],ME_buf[:nnz])
+				nnz = 0
+
+			n = nz.size
+			row_buf[nnz:nnz+n] = nz
+			col_buf[nnz:nnz+n] = nz
+			ME_buf[nnz:nnz+n] = diag[nz]
+			nnz += n
+			diag = None
+
+		if nnz > 0:
+			chunks_nbytes += _append_coo_chunk(chunks,row_buf[:nnz],col_buf[:nnz],ME_buf[:nnz])
+
+		buffer_nbytes = row_buf.nbytes + col_buf.nbytes + ME_buf.nbytes
+		if chunks:
+			A = _merge_coo_chunks(chunks,Ns,dtype)
+			peak_nbytes = max(peak_nbytes,buffer_nbytes+2*chunks_nbytes+_csr_nbytes(A))
+		else:
+			A = None
+			peak_nbytes = max(peak_nbytes,buffer_nbytes)
+
+		if diag is not None:
+			peak_nbytes += diag.nbytes
 
-		if diag is not None and off_diag is not None:
-			indptr = _np.arange(self.Ns+1)
-			return off_diag + _sp.csr_matrix((diag,indptr[:self.Ns],indptr),shape=(self.Ns,self.Ns),dtype=dtype)
+		self._make_matrix_peak_nbytes = peak_nbytes
 
-		elif off_diag is not None:
-			return off_diag
+		if A is not None:
+			return A
 		elif diag is not None:
-			return _sp.dia_matrix((_np.atleast_2d(diag),[0]),shape=(self.Ns,self.Ns),dtype=dtype)
+			return _sp.dia_matrix((_np.atleast_2d(diag),[0]),shape=(Ns,Ns),dtype=dtype)
 		else:
-			return _sp.dia_matrix((self.Ns,self.Ns),dtype=dtype)
+			return _sp.dia_matrix((Ns,Ns),dtype=dtype)
 
 	def partial_trace(self,state,sub_sys_A=None,subsys_ordering=True,return_rdm="A",enforce_pure=False,sparse=False):
 		"""Calculates reduced density matrix, through a partial trace of a quantum state in a lattice `basis`.